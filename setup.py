@@ -21,6 +21,7 @@ setup(
     url='https://swiftype.com/',
     packages=find_packages(),
     install_requires=["anyjson", "six"],
+    extras_require={'http2': ['httpx[http2]; python_version >= "3.8"']},
     test_suite='nose.collector',
     classifiers=[
         'Intended Audience :: Developers',
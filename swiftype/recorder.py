@@ -0,0 +1,102 @@
+from __future__ import unicode_literals
+
+import random
+import threading
+
+import anyjson
+import six
+
+REDACTED = '[REDACTED]'
+DEFAULT_REDACTED_KEYS = ('auth_token', 'client_secret', 'Authorization')
+
+_TEMPLATE_SEGMENTS = {
+    'engines': '{engine_id}',
+    'document_types': '{document_type_id}',
+    'documents': '{document_id}',
+    'domains': '{domain_id}',
+    'users': '{user_id}',
+}
+_ACTION_SEGMENTS = set([
+    'create_or_update', 'bulk_create', 'bulk_create_or_update', 'bulk_create_or_update_verbose',
+    'bulk_update', 'bulk_destroy',
+])
+
+
+def endpoint_template(path):
+  """Replace the resource ids in an API path with named placeholders.
+
+  `engines/youtube/document_types/videos/search` becomes
+  `engines/{engine_id}/document_types/{document_type_id}/search`.
+  """
+  segments = path.strip('/').split('/')
+  template = []
+  for i, segment in enumerate(segments):
+    previous = segments[i - 1] if i else None
+    if previous in _TEMPLATE_SEGMENTS and segment not in _ACTION_SEGMENTS:
+      template.append(_TEMPLATE_SEGMENTS[previous])
+    else:
+      template.append(segment)
+  return '/'.join(template)
+
+
+class Recorder(object):
+  """Appends one JSON line per API request made through a `Connection`.
+
+  Each entry holds the method, endpoint template, concrete path, query
+  parameters, payload size, response status and elapsed time. Requests
+  that fail in the transport are recorded with a `null` status and the
+  exception's class name as `error`. Only a
+  `sample_rate` fraction of requests is written, and the values of
+  `redact` keys are masked in both parameters and headers. Request bodies
+  are kept only when `record_payloads` is set.
+  """
+
+  def __init__(self, log, sample_rate=1.0, redact=DEFAULT_REDACTED_KEYS, record_payloads=False):
+    if isinstance(log, six.string_types):
+      self.__file = open(log, 'a')
+      self.__owns_file = True
+    else:
+      self.__file = log
+      self.__owns_file = False
+    self.sample_rate = sample_rate
+    self.redact = set(key.lower() for key in redact)
+    self.record_payloads = record_payloads
+    self.__lock = threading.Lock()
+
+  def sampled(self):
+    return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+  def record(self, method, path, params, headers, data, body, status, started, elapsed, error=None):
+    entry = {
+        'timestamp': started,
+        'method': method,
+        'endpoint': endpoint_template(path),
+        'path': path,
+        'params': self.__redacted(params),
+        'headers': self.__redacted(headers),
+        'payload_size': len(body.encode('utf-8')) if body else 0,
+        'status': status,
+        'elapsed': elapsed,
+    }
+    if error is not None:
+      entry['error'] = type(error).__name__
+    if self.record_payloads and data:
+      entry['data'] = data
+    line = anyjson.serialize(entry)
+    with self.__lock:
+      self.__file.write(line + '\n')
+      self.__file.flush()
+
+  def close(self):
+    if self.__owns_file:
+      self.__file.close()
+
+  def __redacted(self, values):
+    return dict((k, REDACTED if k.lower() in self.redact else v) for k, v in values.items())
+
+
+def load(log):
+  """Read the entries of a recorder log, ordered by timestamp."""
+  with open(log) as f:
+    entries = [anyjson.deserialize(line) for line in f if line.strip()]
+  return sorted(entries, key=lambda entry: entry['timestamp'])
@@ -0,0 +1,208 @@
+"""Replay a recorder log through a `Client` and report throughput and latency.
+
+    python -m swiftype.replay traffic.jsonl --speed 2 --concurrency 8
+
+Without `--host` the requests are sent to a local stand-in server that
+answers every request with an empty JSON object.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import sys
+import threading
+import time
+
+from six.moves import BaseHTTPServer, queue, socketserver
+
+from . import recorder
+from .swiftype import Client
+
+
+class _StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+  def _respond(self):
+    length = int(self.headers.get('Content-Length') or 0)
+    if length:
+      self.rfile.read(length)
+    if self.server.delay:
+      time.sleep(self.server.delay)
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', '2')
+    self.end_headers()
+    self.wfile.write(b'{}')
+
+  do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+  def log_message(self, format, *args):
+    pass
+
+
+class StandInServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  """Local HTTP server answering every request with `200 {}` after `delay` seconds."""
+
+  daemon_threads = True
+
+  def __init__(self, port=0, delay=0):
+    BaseHTTPServer.HTTPServer.__init__(self, ('localhost', port), _StandInHandler)
+    self.delay = delay
+    self.__thread = None
+
+  @property
+  def host(self):
+    return 'localhost:%d' % self.server_address[1]
+
+  def start(self):
+    self.__thread = threading.Thread(target=self.serve_forever)
+    self.__thread.daemon = True
+    self.__thread.start()
+    return self
+
+  def stop(self):
+    self.shutdown()
+    self.server_close()
+
+
+def _percentile(sorted_values, fraction):
+  if not sorted_values:
+    return 0.0
+  index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+  return sorted_values[index]
+
+
+def summarize(latencies, errors, duration):
+  """Build the report dict for a replay run.
+
+  `latencies` holds the latency in seconds of each successful request;
+  throughput and the latency distribution cover those requests only.
+  """
+  latencies = sorted(latencies)
+  count = len(latencies)
+  return {
+      'successes': count,
+      'errors': errors,
+      'duration': duration,
+      'throughput': count / duration if duration > 0 else 0.0,
+      'latency': {
+          'min': latencies[0] if latencies else 0.0,
+          'mean': sum(latencies) / count if count else 0.0,
+          'p50': _percentile(latencies, 0.50),
+          'p90': _percentile(latencies, 0.90),
+          'p99': _percentile(latencies, 0.99),
+          'max': latencies[-1] if latencies else 0.0,
+      },
+  }
+
+
+def _request_data(entry):
+  if 'data' in entry:
+    return entry['data']
+  if entry['payload_size'] > len('{"padding": ""}'):
+    return {'padding': 'x' * (entry['payload_size'] - len('{"padding": ""}'))}
+  return {}
+
+
+def replay(client, entries, speed=1.0, concurrency=4):
+  """Send `entries` through `client`, keeping their original spacing.
+
+  The gap between requests is divided by `speed`; a `speed` of 0 sends
+  them back to back. Requests are issued by `concurrency` worker threads
+  so a slow server does not hold back the schedule. Latency is measured
+  from the time a request was due, so time spent waiting for a free
+  worker is included; with a `speed` of 0 it is measured from the time a
+  worker sends the request. Any exception raised by a request, including
+  connection errors, counts as an error and is left out of throughput and
+  latency. Recorded payloads are reused when present, otherwise a filler
+  body of the recorded size is sent. The filler drops search queries and
+  documents, so a real API host answers it differently; replays against
+  one need a log recorded with `record_payloads=True`.
+  """
+  pending = queue.Queue()
+  latencies = []
+  errors = [0]
+  lock = threading.Lock()
+
+  def work():
+    while True:
+      item = pending.get()
+      if item is None:
+        return
+      due, entry = item
+      params = dict((k, v) for k, v in entry['params'].items() if v != recorder.REDACTED)
+      started = due if due is not None else time.time()
+      try:
+        client.conn._request(entry['method'], entry['path'], params=params, data=_request_data(entry))
+        failed = False
+      except Exception:
+        failed = True
+      elapsed = time.time() - started
+      with lock:
+        if failed:
+          errors[0] += 1
+        else:
+          latencies.append(elapsed)
+
+  workers = [threading.Thread(target=work) for _ in range(concurrency)]
+  for worker in workers:
+    worker.daemon = True
+    worker.start()
+
+  started = time.time()
+  origin = entries[0]['timestamp'] if entries else 0
+  for entry in entries:
+    due = None
+    if speed:
+      due = started + (entry['timestamp'] - origin) / speed
+      delay = due - time.time()
+      if delay > 0:
+        time.sleep(delay)
+    pending.put((due, entry))
+  for _ in workers:
+    pending.put(None)
+  for worker in workers:
+    worker.join()
+
+  return summarize(latencies, errors[0], time.time() - started)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Replay a Swiftype traffic log.')
+  parser.add_argument('log', help='JSONL log written by swiftype.recorder.Recorder')
+  parser.add_argument('--speed', type=float, default=1.0, help='rate multiplier, 0 to send as fast as possible')
+  parser.add_argument('--concurrency', type=int, default=4)
+  parser.add_argument('--host', help='API host to replay against; defaults to a local stand-in server')
+  parser.add_argument('--delay', type=float, default=0, help='response delay of the stand-in server, in seconds')
+  parser.add_argument('--api-key', default='replay')
+  args = parser.parse_args(argv)
+  if args.speed < 0:
+    parser.error('--speed must be 0 or greater')
+  if args.concurrency < 1:
+    parser.error('--concurrency must be at least 1')
+
+  entries = recorder.load(args.log)
+  missing = len([entry for entry in entries if 'data' not in entry and entry['payload_size'] > 0])
+  if args.host and missing:
+    print('warning: %d of %d requests were recorded without their payload and will be replayed with filler bodies; '
+          'record with record_payloads=True to replay them faithfully' % (missing, len(entries)), file=sys.stderr)
+
+  server = None if args.host else StandInServer(delay=args.delay).start()
+  try:
+    client = Client(api_key=args.api_key, host=args.host or server.host)
+    report = replay(client, entries, speed=args.speed, concurrency=args.concurrency)
+  finally:
+    if server:
+      server.stop()
+
+  print('requests:   %d ok, %d errors' % (report['successes'], report['errors']))
+  print('duration:   %.3fs' % report['duration'])
+  print('throughput: %.1f req/s' % report['throughput'])
+  print('latency:    ' + ' '.join('%s=%.1fms' % (k, report['latency'][k] * 1000) for k in ('min', 'mean', 'p50', 'p90', 'p99', 'max')))
+  replayed = report['successes'] + report['errors']
+  if replayed != len(entries):
+    print('warning: replayed %d of %d requests' % (replayed, len(entries)), file=sys.stderr)
+    sys.exit(1)
+  return report
+
+
+if __name__ == '__main__':
+  main()
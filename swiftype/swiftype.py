@@ -1,31 +1,38 @@
 from __future__ import unicode_literals
 
 import base64
+import logging
 import time
 import hashlib
 
 import anyjson
 from six.moves.urllib_parse import urlunparse, urlencode
 
-try:
-    # VCRpy only works when `httplib` is imported directly on Python 2.x
-    import httplib
-except ImportError:
-    import http.client as httplib
-
+from .transport import HTTPTransport
 from .version import VERSION
 
 USER_AGENT = 'Swiftype-Python/' + VERSION
 DEFAULT_API_HOST = 'api.swiftype.com'
 DEFAULT_API_BASE_PATH = '/api/v1/'
 
+logger = logging.getLogger(__name__)
+
 
 class Client(object):
 
-  def __init__(self, username=None, password=None, api_key=None, access_token=None, client_id=None, client_secret=None, host=DEFAULT_API_HOST):
+  def __init__(self, username=None, password=None, api_key=None, access_token=None, client_id=None, client_secret=None, host=DEFAULT_API_HOST, recorder=None, transport=None):
       self.client_id = client_id
       self.client_secret = client_secret
-      self.conn = Connection(username=username, password=password, api_key=api_key, access_token=access_token, host=host, base_path=DEFAULT_API_BASE_PATH)
+      self.conn = Connection(username=username, password=password, api_key=api_key, access_token=access_token, host=host, base_path=DEFAULT_API_BASE_PATH, recorder=recorder, transport=transport)
+
+  def close(self):
+    self.conn.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
 
   def engines(self, page=None, per_page=None):
     return self.conn._get(self.__engines_path(), self.__pagination_params(page, per_page))
@@ -195,13 +202,21 @@ class HttpException(Exception):
 
 class Connection(object):
 
-  def __init__(self, username=None, password=None, api_key=None, access_token=None, host=None, base_path=None):
+  def __init__(self, username=None, password=None, api_key=None, access_token=None, host=None, base_path=None, recorder=None, transport=None):
     self.__username = username
     self.__password = password
     self.__api_key = api_key
     self.__access_token = access_token
     self.__host = host
     self.__base_path = base_path
+    self.recorder = recorder
+    self.transport = transport if transport is not None else HTTPTransport()
+    self.__owns_transport = transport is None
+
+  def close(self):
+    # A transport passed in by the caller may be shared with other clients.
+    if self.__owns_transport:
+      self.transport.close()
 
   def _get(self, path, params={}, data={}):
     return self._request('GET', path, params=params, data=data)
@@ -239,23 +254,35 @@ class Connection(object):
 
     body = anyjson.serialize(data) if data else ''
 
-    connection = httplib.HTTPConnection(self.__host)
-    connection.request(method, full_path, body, headers)
-
-    response = connection.getresponse()
-    response.body = response.read()
-    if (response.status // 100 == 2):
-        if response.body:
+    record = self.recorder is not None and self.recorder.sampled()
+    started = time.time()
+    status, error = None, None
+    try:
+      status, response_body = self.transport.request(method, self.__host, full_path, body, headers)
+    except Exception as e:
+      error = e
+      raise
+    finally:
+      if record:
+        self.__record(method, path, params, headers, data, body, status, error, started)
+    if (status // 100 == 2):
+        if response_body:
             try:
-                response.body = anyjson.deserialize(response.body.decode('utf-8'))
+                response_body = anyjson.deserialize(response_body.decode('utf-8'))
             except ValueError as e:
-                raise InvalidResponseFromServer('The JSON response could not be parsed: %s.\n%s' % (e, response.body))
-            ret = {'status': response.status, 'body':response.body }
+                raise InvalidResponseFromServer('The JSON response could not be parsed: %s.\n%s' % (e, response_body))
+            ret = {'status': status, 'body':response_body }
         else:
-            ret = {'status': response.status }
-    elif response.status == 401:
-        raise HttpException( response.status, 'Authorization required.')
+            ret = {'status': status }
+    elif status == 401:
+        raise HttpException(status, 'Authorization required.')
     else:
-        raise HttpException(response.status, response.body)
-    connection.close()
+        raise HttpException(status, response_body)
     return ret
+
+  def __record(self, method, path, params, headers, data, body, status, error, started):
+    # A failing recorder must not change the outcome of the API call.
+    try:
+      self.recorder.record(method, path, params, headers, data, body, status, started, time.time() - started, error=error)
+    except Exception:
+      logger.warning('Could not record %s %s', method, path, exc_info=True)
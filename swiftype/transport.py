@@ -0,0 +1,69 @@
+from __future__ import unicode_literals
+
+try:
+    # VCRpy only works when `httplib` is imported directly on Python 2.x
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+
+class Transport(object):
+  """Sends a prepared request and returns its `(status, body)`.
+
+  `Connection` builds the path, headers and JSON body and interprets the
+  response; a transport only moves the bytes. `body` of the returned tuple
+  is the raw response body as bytes. Network errors are not wrapped: they
+  reach the caller as whatever the backend raises, e.g. `socket.error` for
+  `HTTPTransport` and `httpx.TransportError` for `HTTP2Transport`.
+  """
+
+  def request(self, method, host, path, body, headers):
+    raise NotImplementedError
+
+  def close(self):
+    pass
+
+
+class HTTPTransport(Transport):
+  """Default transport: one `httplib` connection per request."""
+
+  def request(self, method, host, path, body, headers):
+    connection = httplib.HTTPConnection(host)
+    try:
+      connection.request(method, path, body, headers)
+      response = connection.getresponse()
+      return response.status, response.read()
+    finally:
+      connection.close()
+
+
+class HTTP2Transport(Transport):
+  """Multiplexes concurrent requests over a single HTTP/2 connection per host.
+
+  Requires the optional `httpx[http2]` package. The transport is safe to
+  share between threads; requests issued concurrently become streams on the
+  same connection instead of queueing behind each other. With the `http`
+  scheme the server must accept HTTP/2 without TLS negotiation. An
+  existing `httpx.Client` can be passed as `client`, in which case
+  `timeout` is ignored and `close()` leaves that client open.
+  """
+
+  def __init__(self, scheme='https', timeout=None, client=None):
+    self.__owns_client = client is None
+    if client is None:
+      try:
+        import httpx
+      except ImportError:
+        raise ImportError('HTTP2Transport requires the httpx package: pip install "httpx[http2]"')
+      client = httpx.Client(http1=scheme != 'http', http2=True, timeout=timeout)
+    self.scheme = scheme
+    self.__client = client
+
+  def request(self, method, host, path, body, headers):
+    url = '%s://%s%s' % (self.scheme, host, path)
+    response = self.__client.request(method, url, content=body or None, headers=headers)
+    return response.status_code, response.content
+
+  def close(self):
+    if self.__owns_client:
+      self.__client.close()
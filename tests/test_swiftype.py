@@ -1,10 +1,20 @@
-from swiftype import swiftype
+from swiftype import swiftype, recorder, replay, transport
 import os
+import socket
+import sys
+import threading
 import time
 import unittest2 as unittest
+import anyjson
+from six import StringIO
 from six.moves.urllib_parse import urlparse, parse_qs
 import vcr
-from mock import Mock
+from mock import Mock, patch
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 class TestClientFunctions(unittest.TestCase):
 
@@ -389,5 +399,249 @@ class TestPlatformResources(unittest.TestCase):
             stati = self.client.create_documents(self.engine, self.document_type, docs)['body']
             self.assertEqual(stati, [True, True])
 
+class FakeTransport(transport.Transport):
+
+    def __init__(self, status=200, body=b'{}'):
+        self.status = status
+        self.body = body
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def request(self, method, host, path, body, headers):
+        with self.lock:
+            self.requests.append({'method': method, 'host': host, 'path': path, 'body': body, 'headers': headers})
+        return self.status, self.body
+
+class TestRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.log = StringIO()
+        self.transport = FakeTransport()
+
+    def __client(self, **kwargs):
+        kwargs.setdefault('api_key', 'secret-key')
+        kwargs.setdefault('recorder', recorder.Recorder(self.log))
+        return swiftype.Client(host='localhost:3000', transport=self.transport, **kwargs)
+
+    def __entries(self):
+        return [anyjson.deserialize(line) for line in self.log.getvalue().splitlines()]
+
+    def test_endpoint_template(self):
+        self.assertEqual(recorder.endpoint_template('engines/youtube/document_types/videos/search'),
+                         'engines/{engine_id}/document_types/{document_type_id}/search')
+        self.assertEqual(recorder.endpoint_template('engines/youtube/document_types/videos/documents/bulk_create'),
+                         'engines/{engine_id}/document_types/{document_type_id}/documents/bulk_create')
+
+    def test_record_redacts_credentials(self):
+        self.__client().search('youtube', 'swiftype', {'page': 2})
+        entry = self.__entries()[0]
+        self.assertEqual(entry['method'], 'GET')
+        self.assertEqual(entry['endpoint'], 'engines/{engine_id}/search')
+        self.assertEqual(entry['params'], {'auth_token': recorder.REDACTED})
+        self.assertEqual(entry['payload_size'], len(anyjson.serialize({'q': 'swiftype', 'page': 2})))
+        self.assertEqual(entry['status'], 200)
+        self.assertNotIn('data', entry)
+        self.assertNotIn('secret-key', self.log.getvalue())
+
+    def test_record_redacts_client_secret(self):
+        self.__client(client_id='client-id', client_secret='client-secret').users()
+        self.assertEqual(self.__entries()[0]['params']['client_secret'], recorder.REDACTED)
+        self.assertNotIn('client-secret', self.log.getvalue())
+
+    def test_record_redacts_authorization_header(self):
+        self.__client(api_key=None, access_token='secret-token').engines()
+        self.assertEqual(self.__entries()[0]['headers']['Authorization'], recorder.REDACTED)
+        self.assertNotIn('secret-token', self.log.getvalue())
+
+    def test_record_transport_error(self):
+        self.transport.request = Mock(side_effect=socket.timeout())
+        with self.assertRaises(socket.timeout):
+            self.__client().engines()
+        entry = self.__entries()[0]
+        self.assertEqual(entry['status'], None)
+        self.assertEqual(entry['error'], socket.timeout.__name__)
+
+    def test_record_failure_does_not_break_request(self):
+        self.log.close()
+        self.assertEqual(self.__client().engines(), {'status': 200, 'body': {}})
+
+    def test_record_sampling(self):
+        self.__client(recorder=recorder.Recorder(self.log, sample_rate=0)).engines()
+        self.assertEqual(self.log.getvalue(), '')
+
+class TestReplay(unittest.TestCase):
+
+    def __entries(self, queries):
+        log = StringIO()
+        client = swiftype.Client(api_key='secret-key', host='localhost:3000', transport=FakeTransport(),
+                                 recorder=recorder.Recorder(log, record_payloads=True))
+        for query in queries:
+            client.search('youtube', query)
+        return [anyjson.deserialize(line) for line in log.getvalue().splitlines()]
+
+    def test_replay(self):
+        server = replay.StandInServer().start()
+        try:
+            client = swiftype.Client(api_key='secret-key', host=server.host)
+            report = replay.replay(client, self.__entries(['a', 'b', 'c']), speed=0, concurrency=2)
+        finally:
+            server.stop()
+        self.assertEqual(report['successes'], 3)
+        self.assertEqual(report['errors'], 0)
+        self.assertTrue(report['latency']['min'] <= report['latency']['p50'] <= report['latency']['max'])
+
+    def test_replay_latency_includes_schedule_lag(self):
+        server = replay.StandInServer(delay=0.05).start()
+        try:
+            client = swiftype.Client(api_key='secret-key', host=server.host)
+            entries = [{'timestamp': i * 0.01, 'method': 'GET', 'path': 'engines', 'params': {}, 'payload_size': 0} for i in range(4)]
+            report = replay.replay(client, entries, speed=1, concurrency=1)
+        finally:
+            server.stop()
+        # The last entry is due at 0.03s but cannot start before the three
+        # earlier ones have each taken 0.05s.
+        self.assertTrue(report['latency']['max'] >= 0.15)
+
+    def test_replay_rejects_invalid_options(self):
+        for option in (['--speed', '-1'], ['--concurrency', '0']):
+            with patch('sys.stderr', StringIO()):
+                with self.assertRaises(SystemExit) as context:
+                    replay.main(['traffic.jsonl'] + option)
+            self.assertEqual(context.exception.code, 2)
+
+    def test_replay_counts_connection_errors(self):
+        closed = socket.socket()
+        closed.bind(('localhost', 0))
+        client = swiftype.Client(api_key='secret-key', host='localhost:%d' % closed.getsockname()[1])
+        closed.close()
+        report = replay.replay(client, self.__entries(['a', 'b', 'c']), speed=0, concurrency=2)
+        self.assertEqual(report['successes'], 0)
+        self.assertEqual(report['errors'], 3)
+        self.assertEqual(report['throughput'], 0.0)
+        self.assertEqual(report['latency']['max'], 0.0)
+
+class TestTransport(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport(body=b'{"slug": "api-test"}')
+        self.client = swiftype.Client(api_key='a-test-api-key', host='localhost:3000', transport=self.transport)
+
+    def test_default_transport(self):
+        client = swiftype.Client(api_key='a-test-api-key')
+        self.assertIsInstance(client.conn.transport, transport.HTTPTransport)
+
+    def test_request(self):
+        response = self.client.search('api-test', 'query', {'page': 2})
+        self.assertEqual(response, {'status': 200, 'body': {'slug': 'api-test'}})
+        request = self.transport.requests[0]
+        self.assertEqual(request['method'], 'GET')
+        self.assertEqual(request['host'], 'localhost:3000')
+        self.assertEqual(request['path'], '/api/v1/engines/api-test/search.json?auth_token=a-test-api-key')
+        self.assertEqual(anyjson.deserialize(request['body']), {'q': 'query', 'page': 2})
+        self.assertEqual(request['headers']['User-Agent'], swiftype.USER_AGENT)
+
+    def test_empty_response(self):
+        self.transport.status, self.transport.body = 204, b''
+        self.assertEqual(self.client.destroy_engine('api-test'), {'status': 204})
+
+    def test_error_response(self):
+        self.transport.status, self.transport.body = 404, b'Not Found'
+        with self.assertRaises(swiftype.HttpException) as context:
+            self.client.engine('missing')
+        self.assertEqual(context.exception.status, 404)
+
+    def test_close_leaves_shared_transport_open(self):
+        self.transport.close = Mock()
+        with self.client as client:
+            client.engines()
+        self.assertFalse(self.transport.close.called)
+
+    def test_close_default_transport(self):
+        client = swiftype.Client(api_key='a-test-api-key')
+        client.conn.transport.close = Mock()
+        client.close()
+        client.conn.transport.close.assert_called_once_with()
+
+    def test_concurrent_requests(self):
+        threads = [threading.Thread(target=self.client.search, args=('api-test', 'query %d' % i)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        queries = sorted(anyjson.deserialize(request['body'])['q'] for request in self.transport.requests)
+        self.assertEqual(queries, sorted('query %d' % i for i in range(20)))
+
+class TestHTTP2Transport(unittest.TestCase):
+
+    def setUp(self):
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __handler(self, request):
+        with self.lock:
+            self.requests.append(request)
+        return httpx.Response(200, content=b'{"slug": "api-test"}')
+
+    def __client(self, scheme='https'):
+        http_client = httpx.Client(transport=httpx.MockTransport(self.__handler))
+        return swiftype.Client(api_key='a-test-api-key', host='localhost:3000', transport=transport.HTTP2Transport(scheme, client=http_client))
+
+    def test_missing_httpx(self):
+        with patch.dict(sys.modules, {'httpx': None}):
+            with self.assertRaisesRegexp(ImportError, 'httpx'):
+                transport.HTTP2Transport()
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_http_versions(self):
+        with patch('httpx.Client') as http_client:
+            transport.HTTP2Transport('https')
+            transport.HTTP2Transport('http')
+        self.assertEqual(http_client.call_args_list[0][1]['http1'], True)
+        self.assertEqual(http_client.call_args_list[1][1]['http1'], False)
+        for call in http_client.call_args_list:
+            self.assertEqual(call[1]['http2'], True)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_close(self):
+        with patch('httpx.Client') as http_client:
+            transport.HTTP2Transport().close()
+        http_client.return_value.close.assert_called_once_with()
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_close_leaves_injected_client_open(self):
+        http_client = Mock()
+        transport.HTTP2Transport(client=http_client).close()
+        self.assertFalse(http_client.close.called)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_request(self):
+        response = self.__client('http').search('api-test', 'query', {'page': 2})
+        self.assertEqual(response, {'status': 200, 'body': {'slug': 'api-test'}})
+        request = self.requests[0]
+        self.assertEqual(request.method, 'GET')
+        self.assertEqual(str(request.url), 'http://localhost:3000/api/v1/engines/api-test/search.json?auth_token=a-test-api-key')
+        self.assertEqual(anyjson.deserialize(request.content.decode('utf-8')), {'q': 'query', 'page': 2})
+        self.assertEqual(request.headers['User-Agent'], swiftype.USER_AGENT)
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_request_without_body(self):
+        self.__client().engines()
+        request = self.requests[0]
+        self.assertEqual(str(request.url), 'https://localhost:3000/api/v1/engines.json?auth_token=a-test-api-key')
+        self.assertEqual(request.content, b'')
+
+    @unittest.skipIf(httpx is None, 'httpx is not installed')
+    def test_shared_between_threads(self):
+        # MockTransport bypasses the httpx connection pool, so this checks
+        # that one transport serves many threads, not HTTP/2 multiplexing.
+        client = self.__client()
+        threads = [threading.Thread(target=client.search, args=('api-test', 'query %d' % i)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        queries = sorted(anyjson.deserialize(request.content.decode('utf-8'))['q'] for request in self.requests)
+        self.assertEqual(queries, sorted('query %d' % i for i in range(20)))
+
 if __name__ == '__main__':
     unittest.main()